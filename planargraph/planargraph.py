@@ -26,6 +26,7 @@ from util import geometry_edges
 from util import geometry_spatial_index
 from util import add_points
 from util import is_1D_geometry
+from util import clip_edge
 
 class PlanarGraph(object):
 
@@ -38,6 +39,9 @@ class PlanarGraph(object):
         self._entries = list()   # liste des arcs en entrée du calcul
         self._done    = False    # calcul fait ou pas ?
         self._nextid  = 0        # prochaine ident à retourner (si bsrce)
+        self._origins = None     # idents dans le graphe d'origine (si sous-graphe)
+        self._edge_si = None     # index spatial des arcs (calcul de la topologie)
+        self._face_si = None     # index spatial des faces (calcul de la topologie)
 
         for key, default in zip(PlanarGraph._INIT_KWARGS,PlanarGraph._INIT_DEFAULT):
             setattr(self,'_'+key,kwargs.get(key,default))
@@ -240,6 +244,9 @@ class PlanarGraph(object):
         faces   = map(lambda pgf: pgf._geom,self._faces)
         face_si = geometry_spatial_index(faces)
 
+        # index spatiaux conservés pour l'extraction de sous-graphes
+        self._edge_si, self._face_si = edge_si, face_si
+
         self._process_rings(edges,faces,edge_si,face_si)
 
 
@@ -261,6 +268,124 @@ class PlanarGraph(object):
         self._done = True
         del self._entries
 
+    # extraction du sous-graphe contenu dans une fenêtre (polygone Shapely,
+    # éventuellement non convexe ou troué, ou rectangle (xmin,ymin,xmax,ymax))
+    # sans recalcul : le résultat est un nouveau PlanarGraph déjà calculé
+    #    - arcs : conservés tels quels s'ils sont couverts par la fenêtre,
+    #      découpés au bord de la fenêtre sinon
+    #    - noeuds : extrémités des arcs (y compris les points de découpe)
+    #    - faces : seules les faces entièrement couvertes par la fenêtre sont
+    #      conservées, les faces à cheval sur le bord sont écartées (et non
+    #      découpées) ; left_face/right_face vaut donc None pour les arcs
+    #      découpés et pour les côtés des arcs bordant une face écartée
+    #    - périmètres : ceux (extérieurs et intérieurs) des faces conservées
+    # origins donne, pour chaque élément du sous-graphe, l'ident de l'élément
+    # dont il est issu dans ce graphe (None pour un noeud créé par découpe).
+    # les index spatiaux sont ceux calculés avec la topologie ; pour un graphe
+    # issu de subgraph, ils sont calculés au premier appel puis conservés.
+
+    def subgraph(self,window):
+
+        if not self._done or not self._btopo:
+            raise PGException('subgraph: topology has not been processed')
+
+        # graphe issu de subgraph : index spatiaux pas encore calculés
+        if self._edge_si is None:
+            self._edge_si = geometry_spatial_index(map(lambda e: e._geom,self._edges))
+            self._face_si = geometry_spatial_index(map(lambda f: f._geom,self._faces))
+
+        # fenêtre : géométrie surfacique Shapely ou rectangle (xmin,ymin,xmax,ymax)
+        if isinstance(window,(tuple,list)):
+            xmin, ymin, xmax, ymax = window
+            window = Polygon(((xmin,ymin),(xmax,ymin),(xmax,ymax),(xmin,ymax)))
+        pwindow = prep(window)
+
+        # seuls les arcs et les faces dont le rectangle englobant intersecte
+        # celui de la fenêtre sont examinés (index spatiaux du graphe)
+
+        # morceaux d'arcs : couples (arc d'origine, géométrie du morceau)
+        # arc couvert par la fenêtre : conservé tel quel (un seul morceau)
+        # arc à cheval sur le bord de la fenêtre : découpé
+        pieces, edge_map = list(), dict()
+        for e in sorted(self._edge_si.intersection(window.bounds)):
+            edge = self._edges[e]._geom
+            if pwindow.covers(edge):
+                edge_map[e] = len(pieces)
+                pieces.append((e,edge))
+            elif pwindow.intersects(edge):
+                pieces.extend([(e,part) for part in clip_edge(edge,window)])
+
+        # faces entièrement couvertes par la fenêtre (les autres sont écartées)
+        # une face couverte a ses périmètres couverts, donc tous leurs arcs
+        # dans edge_map ; le test sur edge_map le garantit quelle que soit la
+        # fenêtre et évite toute incohérence numérique entre les deux covers
+        ring_edges = lambda r: map(lambda (e,d): e,self._rings[r]._edges)
+        face_edges = lambda f: sum(map(ring_edges,[f._extring]+f._intrings),list())
+        kept_faces = sorted(self._face_si.intersection(window.bounds))
+        kept_faces = filter(lambda f: pwindow.covers(self._faces[f]._geom),kept_faces)
+        kept_faces = filter(lambda f: all(e in edge_map for e in face_edges(self._faces[f])),kept_faces)
+        face_map   = dict((f,i) for i,f in enumerate(kept_faces))
+
+        # périmètres (extérieurs et intérieurs) des faces conservées
+        kept_rings = set()
+        for f in kept_faces:
+            kept_rings.add(self._faces[f]._extring)
+            kept_rings.update(self._faces[f]._intrings)
+        kept_rings = sorted(kept_rings)
+        ring_map   = dict((r,i) for i,r in enumerate(kept_rings))
+
+        # sous-graphe avec les mêmes options que le graphe courant, déjà calculé
+        init_kwargs = dict((key,getattr(self,'_'+key)) for key in PlanarGraph._INIT_KWARGS)
+        result = PlanarGraph(**init_kwargs)
+        result._done = True
+        del result._entries
+
+        # construction des arcs et des noeuds du sous-graphe ; les noeuds
+        # créés par la découpe n'ont pas d'équivalent dans le graphe courant
+        result._edges, result._nodes = list(), list()
+        already_done, node_origins = dict(), list()
+        for e,geom in pieces:
+            edge = self._edges[e]
+            ends = { edge._geom.coords[0]  : edge._start_node,
+                     edge._geom.coords[-1] : edge._end_node }
+            new_edge = Edge(geometry=geom,
+                            left_face=face_map.get(edge._left_face),
+                            right_face=face_map.get(edge._right_face))
+            if self._bsrce:
+                new_edge._sources = list(edge._sources)
+            for i,attname in ((0,'_start_node'),(-1,'_end_node')):
+                xy = geom.coords[i]
+                inode = already_done.get(xy,None)
+                if inode is None:
+                    already_done[xy] = inode = len(result._nodes)
+                    result._nodes.append(Node(xy))
+                    node_origins.append(ends.get(xy,None))
+                setattr(new_edge,attname,inode)
+            result._edges.append(new_edge)
+        del already_done
+
+        # faces et périmètres : les arcs des périmètres des faces conservées
+        # sont dans edge_map (cf. sélection des faces), non découpés
+        result._faces = list()
+        for f in kept_faces:
+            face = self._faces[f]
+            result._faces.append(Face(geometry=face._geom,
+                                      extring=ring_map[face._extring],
+                                      intrings=map(lambda r: ring_map[r],face._intrings)))
+
+        result._rings = list()
+        for r in kept_rings:
+            ring = self._rings[r]
+            result._rings.append(Ring(ring._clockwise,map(lambda (e,d): (edge_map[e],d),ring._edges)))
+
+        # correspondance avec les idents du graphe courant (None si nouveau noeud)
+        result._origins = { 'nodes' : node_origins,
+                            'edges' : map(lambda (e,g): e,pieces),
+                            'faces' : kept_faces,
+                            'rings' : kept_rings }
+
+        return result
+
     @property
     def nodes(self):
         return tuple(self._nodes)
@@ -276,3 +401,8 @@ class PlanarGraph(object):
     @property
     def rings(self):
         return tuple(self._rings)
+
+    @property
+    def origins(self):
+        if self._origins is None: return None
+        return dict((k,tuple(v)) for k,v in self._origins.items())
@@ -2,6 +2,7 @@
 
 import sys
 from rtree import Rtree
+from shapely.ops import linemerge
 from shapely.prepared import prep
 from shapely.geometry import Point, MultiPoint
 from shapely.geometry import LineString, MultiLineString
@@ -250,3 +251,38 @@ def is_1D_geometry(geometry):
                 return True
         
     return False
+
+
+def clip_edge(edge,window):
+
+    # partie linéaire de l'intersection (les points isolés sont ignorés)
+    parts = geometry_edges(edge.intersection(window))
+
+    if not parts: return list()
+
+    merged = linemerge(parts)
+    merged = [merged] if isinstance(merged,LineString) else list(merged.geoms)
+
+    # linemerge peut raccorder deux morceaux au noeud de départ/fin de l'arc
+    # (arc fermé sur un noeud intérieur à la fenêtre) : ces noeuds doivent
+    # rester des extrémités, les morceaux sont donc recoupés en ces points
+    ends, parts = (edge.coords[0],edge.coords[-1]), list()
+    for part in merged:
+        coords = list(part.coords)
+        cuts = [i for i in range(1,len(coords)-1) if coords[i] in ends]
+        for i,j in zip([0]+cuts,cuts+[len(coords)-1]):
+            parts.append(LineString(coords[i:j+1]))
+
+    # chaque morceau doit avoir le même sens que l'arc découpé : comparaison
+    # des abscisses curvilignes de deux points intérieurs au premier segment
+    # (jamais sur le noeud de départ/fin, ambigu si l'arc est fermé)
+    result = list()
+    for part in parts:
+        (x0,y0), (x1,y1) = part.coords[0][:2], part.coords[1][:2]
+        d1 = edge.project(Point(x0+(x1-x0)/3.,y0+(y1-y0)/3.))
+        d2 = edge.project(Point(x0+2*(x1-x0)/3.,y0+2*(y1-y0)/3.))
+        if d2 < d1:
+            part = LineString(tuple(part.coords)[::-1])
+        result.append(part)
+
+    return result